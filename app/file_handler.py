@@ -5,16 +5,104 @@
 
 import re
 import os
+import mmap
+import importlib.util
 from pathlib import Path
 from typing import Tuple, List, Optional
 
-try:
-    from docx import Document
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
+# python-docx 导入较慢，只在启动时检查是否已安装，第一次读取 Word 文件时再真正导入
+DOCX_AVAILABLE = importlib.util.find_spec('docx') is not None
+if not DOCX_AVAILABLE:
     print("警告: python-docx 未安装，Word 文件功能将不可用")
 
+_Document = None
+
+
+def _get_document_class():
+    """
+    延迟导入并缓存 python-docx 的 Document 类
+    """
+    global _Document
+    if _Document is None:
+        from docx import Document
+        _Document = Document
+    return _Document
+
+# Word 文档 XML 中使用的元素标签（WordprocessingML 命名空间）
+_W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_W_P = _W_NS + 'p'
+_W_R = _W_NS + 'r'
+_W_HYPERLINK = _W_NS + 'hyperlink'
+_W_T = _W_NS + 't'
+_W_TAB = _W_NS + 'tab'
+_W_BR = _W_NS + 'br'
+_W_CR = _W_NS + 'cr'
+_W_NO_BREAK_HYPHEN = _W_NS + 'noBreakHyphen'
+_W_PTAB = _W_NS + 'ptab'
+_W_TYPE = _W_NS + 'type'
+
+
+# 规范化时需要移除的字符：不属于 \w（字母、数字、下划线）且不是中文的字符
+_NORMALIZE_RE = re.compile(r'[^\w\u4e00-\u9fff]')
+
+# 纯 ASCII 文本使用的 str.translate 删除表（与 _NORMALIZE_RE 在 ASCII 范围内的结果相同）
+_ASCII_NORMALIZE_TABLE = {
+    code: None for code in range(128)
+    if not (chr(code).isalnum() or chr(code) == '_')
+}
+
+
+# numpy 为可选依赖：用于加速大文本的规范化，同样延迟到第一次使用时再导入
+NUMPY_AVAILABLE = importlib.util.find_spec('numpy') is not None
+
+# 超过该长度（字符数）的文本才使用 numpy 规范化，小文本的数组转换开销不划算
+_NUMPY_NORMALIZE_THRESHOLD = 64 * 1024
+
+_np = None
+_BMP_KEEP_TABLE = None
+
+
+def _get_bmp_keep_table():
+    """
+    延迟导入 numpy 并构建基本多文种平面（U+0000 ~ U+FFFF）的保留字符查找表
+    
+    查找表由 _NORMALIZE_RE 直接作用于所有 BMP 字符得到，保证与正则的结果完全一致
+    
+    Returns:
+        Tuple[numpy 模块, 长度为 0x10000 的布尔数组（True 表示保留）]
+    """
+    global _np, _BMP_KEEP_TABLE
+    if _BMP_KEEP_TABLE is None:
+        import numpy
+        # 跳过代理区（U+D800 ~ U+DFFF），它们不是独立的字符
+        all_chars = ''.join(map(chr, range(0xD800))) + ''.join(map(chr, range(0xE000, 0x10000)))
+        kept_chars = _NORMALIZE_RE.sub('', all_chars)
+        table = numpy.zeros(0x10000, dtype=bool)
+        table[numpy.frombuffer(kept_chars.encode('utf-16-le'), dtype=numpy.uint16)] = True
+        _np = numpy
+        _BMP_KEEP_TABLE = table
+    return _np, _BMP_KEEP_TABLE
+
+
+def _normalize_text_numpy(text: str) -> Optional[str]:
+    """
+    使用 numpy 查找表对大文本进行规范化（一次向量化的查表和筛选）
+    
+    Returns:
+        规范化后的文本；如果文本包含 BMP 以外的字符（如 emoji）则返回 None，由调用方回退到正则
+    """
+    np, keep_table = _get_bmp_keep_table()
+    try:
+        units = np.frombuffer(text.encode('utf-16-le'), dtype=np.uint16)
+    except UnicodeEncodeError:
+        return None
+    
+    # 出现代理项说明包含 BMP 以外的字符，查找表无法覆盖
+    if ((units >= 0xD800) & (units <= 0xDFFF)).any():
+        return None
+    
+    return units[keep_table[units]].tobytes().decode('utf-16-le')
+
 
 def normalize_text(text: str) -> str:
     """
@@ -29,13 +117,65 @@ def normalize_text(text: str) -> str:
     if not text:
         return ""
     
+    # 纯 ASCII 文本（如英文字幕）走 str.translate 的 ASCII 快速路径，比正则快一个数量级
+    if text.isascii():
+        return text.translate(_ASCII_NORMALIZE_TABLE)
+    
+    # 大文本优先使用 numpy 查找表进行向量化处理
+    if NUMPY_AVAILABLE and len(text) > _NUMPY_NORMALIZE_THRESHOLD:
+        normalized = _normalize_text_numpy(text)
+        if normalized is not None:
+            return normalized
+    
     # 使用正则表达式移除所有标点符号、空格、换行等
     # 只保留中文字符、英文字母和数字
-    normalized = re.sub(r'[^\w\u4e00-\u9fff]', '', text)
+    normalized = _NORMALIZE_RE.sub('', text)
     
     return normalized
 
 
+# 文本文件开头的字节顺序标记（BOM）及其对应编码
+_BOM_ENCODINGS = (
+    (b'\xef\xbb\xbf', 'utf-8-sig'),
+    (b'\xff\xfe', 'utf-16'),
+    (b'\xfe\xff', 'utf-16'),
+)
+
+
+def decode_text_bytes(data) -> str:
+    """
+    将文本文件的字节内容解码为字符串
+    
+    先根据 BOM 直接确定编码；没有 BOM（或按 BOM 对应的编码解码失败）时依次尝试 UTF-8、GBK、latin-1。
+    解码器在遇到第一个非法字节时就会停止，因此非 UTF-8 文件通常只需扫描开头的少量字节就会切换到下一种编码
+    
+    Args:
+        data: 文件的字节内容（bytes，或 memoryview 等支持缓冲区协议的对象，解码时不会额外复制）
+        
+    Returns:
+        解码后的文本
+    """
+    for bom, encoding in _BOM_ENCODINGS:
+        if data[:len(bom)] == bom:
+            try:
+                return str(data, encoding)
+            except UnicodeDecodeError:
+                # 开头的字节只是碰巧与 BOM 相同，按没有 BOM 处理
+                break
+    
+    try:
+        return str(data, 'utf-8')
+    except UnicodeDecodeError:
+        pass
+    
+    # 如果 UTF-8 失败，尝试使用 GBK 编码（常见的中文编码）
+    try:
+        return str(data, 'gbk')
+    except UnicodeDecodeError:
+        # 最后尝试 latin-1（几乎不会失败，但可能产生乱码）
+        return str(data, 'latin-1', 'ignore')
+
+
 def read_txt_file(file_path: str) -> Tuple[str, str]:
     """
     读取 TXT 文件
@@ -46,24 +186,78 @@ def read_txt_file(file_path: str) -> Tuple[str, str]:
     Returns:
         Tuple[原始文本, 规范化文本]
     """
-    try:
-        # 尝试使用 UTF-8 编码读取
-        with open(file_path, 'r', encoding='utf-8') as f:
-            original_text = f.read()
-    except UnicodeDecodeError:
-        # 如果 UTF-8 失败，尝试使用 GBK 编码（常见的中文编码）
-        try:
-            with open(file_path, 'r', encoding='gbk') as f:
-                original_text = f.read()
-        except UnicodeDecodeError:
-            # 最后尝试 latin-1（几乎不会失败，但可能产生乱码）
-            with open(file_path, 'r', encoding='latin-1', errors='ignore') as f:
-                original_text = f.read()
+    # 将文件映射到内存后直接解码，省去把整个文件读入 bytes 的一次复制
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # 空文件无法建立内存映射
+            original_text = ''
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                # memoryview 需要在关闭映射之前释放
+                with memoryview(mapped) as view:
+                    original_text = decode_text_bytes(view)
     
     normalized_text = normalize_text(original_text)
     return original_text, normalized_text
 
 
+def _extract_paragraph_text(paragraph) -> str:
+    """
+    提取单个段落（<w:p> 元素）的文本
+    
+    直接遍历段落下的 run（包括超链接中的 run），效果与 python-docx 的
+    paragraph.text 相同，但避免了为每个 run 创建代理对象
+    """
+    parts = []
+    for child in paragraph:
+        if child.tag == _W_R:
+            runs = (child,)
+        elif child.tag == _W_HYPERLINK:
+            runs = child.iterchildren(_W_R)
+        else:
+            continue
+        for run in runs:
+            for item in run:
+                tag = item.tag
+                if tag == _W_T:
+                    parts.append(item.text or '')
+                elif tag == _W_TAB or tag == _W_PTAB:
+                    parts.append('\t')
+                elif tag == _W_BR:
+                    # 只有换行符产生 '\n'，分页符和分栏符不产生文本
+                    if item.get(_W_TYPE, 'textWrapping') == 'textWrapping':
+                        parts.append('\n')
+                elif tag == _W_CR:
+                    parts.append('\n')
+                elif tag == _W_NO_BREAK_HYPHEN:
+                    parts.append('-')
+    return ''.join(parts)
+
+
+def extract_docx_text(source) -> str:
+    """
+    提取 Word (.docx) 文档正文中所有非空段落的文本
+    
+    Args:
+        source: Word 文件路径或文件对象（如 io.BytesIO）
+        
+    Returns:
+        用换行符连接的段落文本
+    """
+    if not DOCX_AVAILABLE:
+        raise ImportError("python-docx 未安装，无法读取 Word 文件")
+    
+    doc = _get_document_class()(source)
+    # 一次遍历正文的直接子段落（与 doc.paragraphs 范围一致）
+    paragraphs = []
+    for paragraph in doc.element.body.iterchildren(_W_P):
+        text = _extract_paragraph_text(paragraph)
+        if text.strip():  # 忽略空段落
+            paragraphs.append(text)
+    
+    return '\n'.join(paragraphs)
+
+
 def read_docx_file(file_path: str) -> Tuple[str, str]:
     """
     读取 Word (.docx) 文件
@@ -78,15 +272,8 @@ def read_docx_file(file_path: str) -> Tuple[str, str]:
         raise ImportError("python-docx 未安装，无法读取 Word 文件")
     
     try:
-        doc = Document(file_path)
-        # 提取所有段落文本
-        paragraphs = []
-        for paragraph in doc.paragraphs:
-            if paragraph.text.strip():  # 忽略空段落
-                paragraphs.append(paragraph.text)
-        
-        # 合并所有段落，用换行符连接
-        original_text = '\n'.join(paragraphs)
+        # 提取所有段落文本，用换行符连接
+        original_text = extract_docx_text(file_path)
         normalized_text = normalize_text(original_text)
         
         return original_text, normalized_text
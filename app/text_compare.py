@@ -3,14 +3,37 @@
 负责比较两个文本文件的内容，识别差异并生成高亮信息
 """
 
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Sequence
 import difflib
+import operator
+import re
+
+# rapidfuzz 为可选依赖：提供 C++ 实现的位并行 Levenshtein 编辑操作，未安装时回退到 difflib
+try:
+    from rapidfuzz.distance import Levenshtein
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+# 规范化保留/移除的字符（与 file_handler.normalize_text 的规则一致），在模块加载时预编译
+_KEEP_CHAR_RE = re.compile(r'[\w\u4e00-\u9fff]')
+_REMOVE_CHAR_RE = re.compile(r'[^\w\u4e00-\u9fff]')
+
+# 去掉公共前缀和后缀后，两段不同部分长度的乘积（比对算法的计算量）超过该值时不再逐字符比对
+# （避免超大差异导致界面长时间无响应），而是将不同部分整体标记为替换/删除/插入。
+# 两种实现的耗时都随长度乘积增长，按各自约几秒的耗时取值：rapidfuzz 约为 10 万 × 10 万字符，
+# difflib 慢一个数量级以上，约为 1 万 × 1 万字符
+MAX_DIFF_CELLS = 10_000_000_000
+MAX_DIFF_CELLS_DIFFLIB = 100_000_000
 
 
 class TextDiff:
     """
     文本差异类，用于存储单个差异片段的信息
     """
+    # 固定属性，不为每个差异片段创建 __dict__
+    __slots__ = ('text', 'status', 'start_pos', 'end_pos')
+    
     def __init__(self, text: str, status: str, start_pos: int, end_pos: int):
         """
         Args:
@@ -34,56 +57,159 @@ class TextDiff:
         }
 
 
-def compare_texts(text1: str, text2: str) -> Tuple[List[TextDiff], List[TextDiff]]:
+# 按 (text, status, start_pos, end_pos) 的顺序读取差异片段的属性，attrgetter 在 C 层完成
+_pack_diff = operator.attrgetter('text', 'status', 'start_pos', 'end_pos')
+
+
+def pack_diffs(diffs: List[TextDiff]) -> List[Tuple[str, str, int, int]]:
+    """
+    将差异列表批量转换为 (text, status, start_pos, end_pos) 元组列表，用于向前端传输
+    
+    与逐个调用 to_dict() 相比，不需要为每个差异片段创建字典
+    
+    Args:
+        diffs: 差异列表
+        
+    Returns:
+        元组列表，JSON 序列化后为数组
+    """
+    return list(map(_pack_diff, diffs))
+
+
+def _common_prefix_length(text1: str, text2: str) -> int:
+    """
+    计算两个文本的公共前缀长度
+    
+    使用二分查找配合切片比较，逐段比较在 C 层完成，避免逐字符的 Python 循环
+    """
+    low, high = 0, min(len(text1), len(text2))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if text1[low:mid] == text2[low:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def _common_suffix_length(text1: str, text2: str, limit: int) -> int:
+    """
+    计算两个文本的公共后缀长度（不超过 limit，避免与公共前缀重叠）
+    """
+    len1, len2 = len(text1), len(text2)
+    low, high = 0, limit
+    while low < high:
+        mid = (low + high + 1) // 2
+        if text1[len1 - mid:len1 - low] == text2[len2 - mid:len2 - low]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def _common_affix_lengths(text1: str, text2: str) -> Tuple[int, int]:
+    """
+    计算两个文本的公共前缀长度和公共后缀长度（两者不重叠）
+    
+    Returns:
+        Tuple[公共前缀长度, 公共后缀长度]
+    """
+    prefix_len = _common_prefix_length(text1, text2)
+    suffix_len = _common_suffix_length(text1, text2, min(len(text1), len(text2)) - prefix_len)
+    return prefix_len, suffix_len
+
+
+def _is_diff_too_large(len1: int, len2: int) -> bool:
+    """
+    判断两段长度分别为 len1、len2 的文本逐字符比对的计算量是否超过当前实现的上限
+    """
+    limit = MAX_DIFF_CELLS if RAPIDFUZZ_AVAILABLE else MAX_DIFF_CELLS_DIFFLIB
+    return len1 * len2 > limit
+
+
+def _get_opcodes(text1: str, text2: str):
+    """
+    获取把 text1 变为 text2 的操作码序列
+    
+    优先使用 rapidfuzz 的 Levenshtein.opcodes（C++ 实现），未安装时使用 difflib
+    
+    Returns:
+        (tag, i1, i2, j1, j2) 形式的操作码序列，tag 为 'equal'、'delete'、'insert' 或 'replace'
+    """
+    if RAPIDFUZZ_AVAILABLE:
+        return Levenshtein.opcodes(text1, text2)
+    
+    # 关闭 autojunk：否则长文本中出现频率较高的字符（如"的"、"是"）会被当作垃圾元素忽略，导致差异结果错误
+    matcher = difflib.SequenceMatcher(None, text1, text2, autojunk=False)
+    return matcher.get_opcodes()
+
+
+def compare_texts(text1: str, text2: str) -> Tuple[List[TextDiff], List[TextDiff], bool]:
     """
     比较两个文本，返回差异信息列表
     
-    使用 difflib 的 SequenceMatcher 来找出两个文本的差异
+    先去掉两个文本的公共前缀和公共后缀，只对中间不同的部分计算操作码
+    （rapidfuzz 或 difflib），位置信息会加上前缀长度的偏移。
+    中间部分的比对计算量过大时，将其整体标记为一个差异片段（近似结果）
     
     Args:
         text1: 第一个文本
         text2: 第二个文本
         
     Returns:
-        Tuple[文本1的差异列表, 文本2的差异列表]
+        Tuple[文本1的差异列表, 文本2的差异列表, 是否为近似结果]
     """
-    # 使用 difflib 进行文本比对
-    matcher = difflib.SequenceMatcher(None, text1, text2)
+    # 去掉公共前缀和后缀（字幕文件通常只有少量区域不同）
+    prefix_len, suffix_len = _common_affix_lengths(text1, text2)
+    middle1 = text1[prefix_len:len(text1) - suffix_len]
+    middle2 = text2[prefix_len:len(text2) - suffix_len]
     
     diffs1 = []
     diffs2 = []
-    pos1 = 0
-    pos2 = 0
-    
-    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-        if tag == 'equal':
-            # 相同的部分
-            text1_segment = text1[i1:i2]
-            text2_segment = text2[j1:j2]
-            diffs1.append(TextDiff(text1_segment, 'equal', pos1, pos1 + len(text1_segment)))
-            diffs2.append(TextDiff(text2_segment, 'equal', pos2, pos2 + len(text2_segment)))
-            pos1 += len(text1_segment)
-            pos2 += len(text2_segment)
-        elif tag == 'delete':
-            # 文本1中删除的部分（文本2中没有）
-            text1_segment = text1[i1:i2]
-            diffs1.append(TextDiff(text1_segment, 'delete', pos1, pos1 + len(text1_segment)))
-            pos1 += len(text1_segment)
-        elif tag == 'insert':
-            # 文本2中插入的部分（文本1中没有）
-            text2_segment = text2[j1:j2]
-            diffs2.append(TextDiff(text2_segment, 'insert', pos2, pos2 + len(text2_segment)))
-            pos2 += len(text2_segment)
-        elif tag == 'replace':
-            # 替换的部分（两个文本都有，但内容不同）
-            text1_segment = text1[i1:i2]
-            text2_segment = text2[j1:j2]
-            diffs1.append(TextDiff(text1_segment, 'replace', pos1, pos1 + len(text1_segment)))
-            diffs2.append(TextDiff(text2_segment, 'replace', pos2, pos2 + len(text2_segment)))
-            pos1 += len(text1_segment)
-            pos2 += len(text2_segment)
-    
-    return diffs1, diffs2
+    
+    if prefix_len:
+        prefix = text1[:prefix_len]
+        diffs1.append(TextDiff(prefix, 'equal', 0, prefix_len))
+        diffs2.append(TextDiff(prefix, 'equal', 0, prefix_len))
+    
+    # 计算量过大时不逐字符比对，中间部分整体作为一个替换片段
+    len1, len2 = len(middle1), len(middle2)
+    approximate = _is_diff_too_large(len1, len2)
+    if approximate:
+        opcodes = [('replace', 0, len1, 0, len2)]
+    else:
+        opcodes = _get_opcodes(middle1, middle2)
+    
+    # 对中间部分进行文本比对：一次遍历操作码同时生成两侧的差异
+    # 操作码的位置区间是连续的，直接加上前缀长度即为在完整文本中的位置
+    for tag, i1, i2, j1, j2 in opcodes:
+        # 'insert' 只出现在文本2中（文本1中没有），其余状态在文本1中都有对应片段
+        if tag != 'insert':
+            diffs1.append(TextDiff(middle1[i1:i2], tag, prefix_len + i1, prefix_len + i2))
+        # 'delete' 只出现在文本1中（文本2中没有），其余状态在文本2中都有对应片段
+        if tag != 'delete':
+            diffs2.append(TextDiff(middle2[j1:j2], tag, prefix_len + j1, prefix_len + j2))
+    
+    if suffix_len:
+        suffix = text1[len(text1) - suffix_len:]
+        diffs1.append(TextDiff(suffix, 'equal', len(text1) - suffix_len, len(text1)))
+        diffs2.append(TextDiff(suffix, 'equal', len(text2) - suffix_len, len(text2)))
+    
+    return diffs1, diffs2, approximate
+
+
+def compare_texts_packed(text1: str, text2: str) -> Tuple[List[Tuple[str, str, int, int]],
+                                                          List[Tuple[str, str, int, int]], bool]:
+    """
+    比较两个文本，返回打包为元组列表的差异信息（见 pack_diffs）
+    
+    元组列表可以直接在进程之间传递，用于在子进程中执行比对
+    
+    Returns:
+        Tuple[文本1的差异元组列表, 文本2的差异元组列表, 是否为近似结果]
+    """
+    diffs1, diffs2, approximate = compare_texts(text1, text2)
+    return pack_diffs(diffs1), pack_diffs(diffs2), approximate
 
 
 def build_char_mapping(original: str, normalized: str) -> List[int]:
@@ -99,6 +225,11 @@ def build_char_mapping(original: str, normalized: str) -> List[int]:
     Returns:
         位置映射列表，长度为规范化文本的长度
     """
+    # 常见情况：规范化文本由原始文本直接规范化得到（未经编辑），
+    # 此时映射就是原始文本中每个保留字符的位置，用预编译的正则扫描即可，无需逐字符循环
+    if _REMOVE_CHAR_RE.sub('', original) == normalized:
+        return [match.start() for match in _KEEP_CHAR_RE.finditer(original)]
+    
     mapping = []
     orig_pos = 0
     norm_pos = 0
@@ -116,7 +247,6 @@ def build_char_mapping(original: str, normalized: str) -> List[int]:
         else:
             # 如果字符不匹配，原始文本中的字符可能是被规范化的字符（标点、空格等）
             # 检查原始字符是否应该被跳过
-            import re
             # 如果原始字符是标点、空格等（不在规范化文本中的字符），跳过它
             if not (orig_char.isalnum() or ('\u4e00' <= orig_char <= '\u9fff')):
                 orig_pos += 1
@@ -138,7 +268,8 @@ def build_char_mapping(original: str, normalized: str) -> List[int]:
     return mapping
 
 
-def map_diff_to_original_improved(original: str, normalized: str, normalized_diffs: List[TextDiff]) -> List[TextDiff]:
+def map_diff_to_original_improved(original: str, normalized: str, normalized_diffs: List[TextDiff],
+                                  char_mapping: Optional[Sequence[int]] = None) -> List[TextDiff]:
     """
     将规范化文本的差异映射回原始文本（改进版本）
     
@@ -148,6 +279,7 @@ def map_diff_to_original_improved(original: str, normalized: str, normalized_dif
         original: 原始文本
         normalized: 规范化文本
         normalized_diffs: 规范化文本的差异列表
+        char_mapping: 预先计算好的位置映射（build_char_mapping 的结果），为 None 时现场计算
         
     Returns:
         原始文本的差异列表
@@ -157,7 +289,8 @@ def map_diff_to_original_improved(original: str, normalized: str, normalized_dif
         return []
     
     # 建立位置映射：规范化文本位置 -> 原始文本位置
-    char_mapping = build_char_mapping(original, normalized)
+    if char_mapping is None:
+        char_mapping = build_char_mapping(original, normalized)
     
     # 将规范化文本的差异映射到原始文本
     original_diffs = []
@@ -194,7 +327,9 @@ def map_diff_to_original_improved(original: str, normalized: str, normalized_dif
 
 
 def compare_normalized_texts(original1: str, normalized1: str, 
-                            original2: str, normalized2: str) -> Tuple[List[Dict], List[Dict]]:
+                            original2: str, normalized2: str,
+                            char_mapping1: Optional[Sequence[int]] = None,
+                            char_mapping2: Optional[Sequence[int]] = None) -> Tuple[List[Dict], List[Dict], bool]:
     """
     基于规范化文本进行比较，但返回原始文本的差异信息
     
@@ -205,22 +340,24 @@ def compare_normalized_texts(original1: str, normalized1: str,
         normalized1: 文本1的规范化内容（已去除标点、空格、换行）
         original2: 文本2的原始内容
         normalized2: 文本2的规范化内容（已去除标点、空格、换行）
+        char_mapping1: 文本1预先计算好的位置映射（可选，文本未变化时可复用）
+        char_mapping2: 文本2预先计算好的位置映射（可选，文本未变化时可复用）
         
     Returns:
-        Tuple[文本1的差异字典列表, 文本2的差异字典列表]
+        Tuple[文本1的差异字典列表, 文本2的差异字典列表, 是否为近似结果]
     """
     # 比较规范化文本
-    diffs_norm1, diffs_norm2 = compare_texts(normalized1, normalized2)
+    diffs_norm1, diffs_norm2, approximate = compare_texts(normalized1, normalized2)
     
     # 将规范化文本的差异映射回原始文本
-    diffs_orig1 = map_diff_to_original_improved(original1, normalized1, diffs_norm1)
-    diffs_orig2 = map_diff_to_original_improved(original2, normalized2, diffs_norm2)
+    diffs_orig1 = map_diff_to_original_improved(original1, normalized1, diffs_norm1, char_mapping1)
+    diffs_orig2 = map_diff_to_original_improved(original2, normalized2, diffs_norm2, char_mapping2)
     
     # 转换为字典列表
-    return [diff.to_dict() for diff in diffs_orig1], [diff.to_dict() for diff in diffs_orig2]
+    return [diff.to_dict() for diff in diffs_orig1], [diff.to_dict() for diff in diffs_orig2], approximate
 
 
-def simple_compare_original_texts(text1: str, text2: str) -> Tuple[List[Dict], List[Dict]]:
+def simple_compare_original_texts(text1: str, text2: str) -> Tuple[List[Dict], List[Dict], bool]:
     """
     直接比较原始文本（不进行规范化处理）
     
@@ -231,7 +368,7 @@ def simple_compare_original_texts(text1: str, text2: str) -> Tuple[List[Dict], L
         text2: 第二个文本
         
     Returns:
-        Tuple[文本1的差异字典列表, 文本2的差异字典列表]
+        Tuple[文本1的差异字典列表, 文本2的差异字典列表, 是否为近似结果]
     """
-    diffs1, diffs2 = compare_texts(text1, text2)
-    return [diff.to_dict() for diff in diffs1], [diff.to_dict() for diff in diffs2]
+    diffs1, diffs2, approximate = compare_texts(text1, text2)
+    return [diff.to_dict() for diff in diffs1], [diff.to_dict() for diff in diffs2], approximate
@@ -12,7 +12,8 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 args = [
     'main.py',                    # 主程序文件
     '--name=字幕核对工具',         # 可执行文件名称
-    '--onefile',                  # 打包成单个可执行文件
+    '--onedir',                   # 打包成目录（避免单文件模式每次启动时解压到临时目录）
+    '--noupx',                    # 不使用 UPX 压缩（解压会拖慢启动）
     '--windowed',                 # Windows: 不显示控制台窗口
     '--noconsole',                # 不显示控制台（Windows）
     '--icon=icon.ico',                # 图标文件路径（如果有）
@@ -22,6 +23,8 @@ args = [
     '--hidden-import=docx',       # 明确导入 python-docx
     '--collect-all=eel',          # 收集 eel 的所有数据文件
     '--collect-all=docx',         # 收集 python-docx 的所有数据文件
+    '--exclude-module=tkinter',   # 排除未使用的标准库模块，减小打包体积
+    '--exclude-module=xml.dom',
 ]
 
 # 如果是 Linux/Mac，修改 add-data 的分隔符
@@ -8,62 +8,275 @@ import os
 import sys
 import atexit
 import signal
+import binascii
+import hashlib
+import io
+import itertools
+import multiprocessing
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 
+# orjson 为可选依赖：用于加速 Eel 与前端通信时的 JSON 序列化（比对结果可能包含大量差异片段）
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # 导入自定义模块
-from app.file_handler import read_file, normalize_text
-from app.text_compare import simple_compare_original_texts, compare_normalized_texts
+from app.file_handler import read_file, normalize_text, extract_docx_text, decode_text_bytes
+from app.text_compare import (simple_compare_original_texts, compare_normalized_texts, compare_texts_packed,
+                              build_char_mapping)
+
+
+def _install_fast_json() -> None:
+    """
+    使用 orjson 替换 Eel 内部向前端发送消息时使用的 JSON 序列化函数
+    
+    orjson 无法处理的数据（如包含单独代理字符的字符串）回退到 Eel 原有的实现
+    """
+    if orjson is None or not hasattr(eel, '_safe_json'):
+        return
+    
+    default_safe_json = eel._safe_json
+    
+    def _orjson_safe_json(obj) -> str:
+        try:
+            # 与 Eel 原实现一致：无法序列化的对象输出为 null
+            return orjson.dumps(obj, default=lambda o: None).decode('utf-8')
+        except (orjson.JSONEncodeError, TypeError):
+            return default_safe_json(obj)
+    
+    eel._safe_json = _orjson_safe_json
+
+
+class FileSlot:
+    """
+    文件槽位，存储一个已加载文件的内容（不保存到源文件）
+    
+    使用 __slots__ 固定属性，每次 API 调用访问文件内容时不再需要多级字典查找
+    """
+    __slots__ = ('path', 'original', 'normalized', 'norm_digest', 'char_mapping')
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self) -> None:
+        """清空槽位内容，释放文本占用的内存"""
+        self.path = None
+        self.original = ''
+        self.normalized = ''
+        # 规范化文本的摘要，用于快速判断两个文件内容是否完全相同
+        self.norm_digest = None
+        # 规范化文本到原始文本的位置映射，在首次需要时计算，文本变化时置为 None
+        self.char_mapping = None
+    
+    def set_normalized(self, text: str) -> None:
+        """
+        更新规范化文本，同时更新摘要并清除依赖于旧文本的位置映射
+        """
+        self.normalized = text
+        # 前端编辑的文本可能包含单独的代理字符，使用 surrogatepass 保证可以编码
+        self.norm_digest = hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        self.char_mapping = None
+
 
-# 初始化 Eel，指定前端文件目录
-eel.init('web')
+# 全局变量：两个文件槽位，按 file_index - 1 索引
+current_files = (FileSlot(), FileSlot())
 
 
-# 全局变量：存储当前加载的文件内容（不保存到源文件）
-current_files = {
-    'file1': {
-        'path': None,
-        'original': '',
-        'normalized': ''
-    },
-    'file2': {
-        'path': None,
-        'original': '',
-        'normalized': ''
-    }
-}
+def _get_slot(file_index: int) -> FileSlot:
+    """
+    根据文件索引（1 或 2）获取对应的文件槽位
+    """
+    if file_index not in (1, 2):
+        raise ValueError(f"无效的文件索引: {file_index}")
+    return current_files[file_index - 1]
+
+
+def _share_text(slot: FileSlot, field: str, text: str) -> str:
+    """
+    如果另一个文件中已保存了相同的文本，则复用同一个字符串对象
+    
+    两个文件加载相同内容时（例如核对格式），只在内存中保留一份文本
+    
+    Args:
+        slot: 当前文件槽位
+        field: 文本字段（'original' 或 'normalized'）
+        text: 新的文本内容
+        
+    Returns:
+        与另一个文件共享的字符串对象，或原样返回 text
+    """
+    other = current_files[1] if slot is current_files[0] else current_files[0]
+    other_text = getattr(other, field)
+    if other_text == text:
+        return other_text
+    return text
+
+
+def _get_char_mapping(slot: FileSlot) -> array:
+    """
+    获取文件的规范化文本到原始文本的位置映射
+    
+    映射只依赖于文件的原始文本和规范化文本，计算一次后缓存在槽位中，
+    直到文件重新加载或被编辑
+    
+    Args:
+        slot: 文件槽位
+        
+    Returns:
+        位置映射（紧凑的整数数组）
+    """
+    if slot.char_mapping is None:
+        slot.char_mapping = array('q', build_char_mapping(slot.original, slot.normalized))
+    return slot.char_mapping
+
+
+# 比对结果缓存：键为两个文本的哈希，值为比对结果字典（LRU，最多保留 8 条）
+_compare_cache = OrderedDict()
+_COMPARE_CACHE_SIZE = 8
+# 比对任务完成时在进程池的后台线程中写入缓存，读写缓存时需要加锁
+_compare_cache_lock = threading.Lock()
+
+def _reset_worker_signals() -> None:
+    """
+    比对子进程的初始化函数：恢复 SIGINT/SIGTERM 的默认处理，子进程收到信号时直接退出
+    """
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def _create_executor() -> ProcessPoolExecutor:
+    """
+    创建比对任务进程池
+    
+    各平台统一使用 spawn 方式启动子进程：fork 出的子进程会继承主进程的信号处理器和锁的状态，
+    收到信号时可能在继承来的锁上死锁
+    """
+    return ProcessPoolExecutor(max_workers=2,
+                               mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_reset_worker_signals)
+
+
+# 比对任务进程池：耗时的比对在子进程中执行。rapidfuzz 的比对在整个 C++ 调用期间持有 GIL，
+# 放在线程中仍会阻塞 Eel 处理前端的其他请求，因此使用进程而不是线程。
+# 子进程在第一次提交任务时才启动；子进程异常退出导致进程池损坏时会重新创建
+_executor = _create_executor()
+# 正在执行或尚未取走结果的比对任务：任务 ID -> Future（按提交顺序排列）
+_jobs = OrderedDict()
+# 最多保留的任务数：前端未取走结果（如比对期间刷新页面）的任务超出该数量时按提交顺序淘汰
+_MAX_JOBS = 4
+_job_ids = itertools.count(1)
+
+# 差异部分过大、compare_texts 只给出整体替换的近似结果时，替换比对结果中的提示信息
+_APPROXIMATE_MESSAGE = '差异部分过大，已整体标记为不同（近似结果）'
+
+# 标记资源是否已清理，防止 cleanup_resources 被重复执行
+_cleaned_up = threading.Event()
+
+
+def _get_cached_result(key: tuple):
+    """
+    从比对缓存中取出结果，命中时将其标记为最近使用
+    
+    Returns:
+        结果字典的浅拷贝，未命中时返回 None
+    """
+    with _compare_cache_lock:
+        result = _compare_cache.get(key)
+        if result is None:
+            return None
+        _compare_cache.move_to_end(key)
+        return dict(result)
+
+
+def _store_cached_result(key: tuple, result: dict) -> None:
+    """
+    将比对结果写入缓存，超出容量时淘汰最久未使用的条目
+    """
+    with _compare_cache_lock:
+        _compare_cache[key] = result
+        _compare_cache.move_to_end(key)
+        while len(_compare_cache) > _COMPARE_CACHE_SIZE:
+            _compare_cache.popitem(last=False)
+
+
+def _clear_compare_cache() -> None:
+    """
+    清空比对缓存（文件内容变化时调用）
+    """
+    with _compare_cache_lock:
+        _compare_cache.clear()
+
+
+def _submit_compare(text1: str, text2: str):
+    """
+    将规范化文本的比对提交到进程池
+    
+    进程池已损坏（如子进程因内存不足被系统结束）时重新创建进程池后再提交，
+    避免之后的所有比对都失败
+    
+    Returns:
+        比对任务的 Future
+    """
+    global _executor
+    try:
+        return _executor.submit(compare_texts_packed, text1, text2)
+    except BrokenProcessPool:
+        _executor = _create_executor()
+        return _executor.submit(compare_texts_packed, text1, text2)
+
+
+def _stop_executor() -> None:
+    """
+    停止比对进程池并结束所有子进程
+    
+    cleanup_resources 随后会调用 os._exit，进程池的管理线程来不及通知子进程退出，
+    因此在这里直接结束子进程，避免主进程退出后子进程残留（Windows 上残留的进程还会锁住程序文件）
+    """
+    # shutdown 之后进程池不再保留子进程列表，需要先取出
+    processes = list((getattr(_executor, '_processes', None) or {}).values())
+    for future in _jobs.values():
+        future.cancel()
+    _executor.shutdown(wait=False)
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join(timeout=1)
 
 
 def cleanup_resources():
     """
     清理所有资源：释放内存、关闭连接
     
-    这个函数会在程序退出时被调用，确保所有资源都被正确释放
+    这个函数会在程序退出时被调用，确保所有资源都被正确释放。
+    它同时注册在 atexit、信号处理和 main() 的异常处理中，只有第一次调用会执行清理
     """
-    global current_files
+    if _cleaned_up.is_set():
+        return
+    _cleaned_up.set()
     
     try:
         # 1. 清理全局变量，释放内存
-        current_files['file1'] = {
-            'path': None,
-            'original': '',
-            'normalized': ''
-        }
-        current_files['file2'] = {
-            'path': None,
-            'original': '',
-            'normalized': ''
-        }
+        for slot in current_files:
+            slot.reset()
+        
+        _clear_compare_cache()
         
-        # 2. 强制垃圾回收
-        import gc
-        gc.collect()
+        # 停止比对进程池（不等待正在执行的任务）
+        _stop_executor()
+        _jobs.clear()
         
         print('资源已清理')
         
     except Exception as e:
         print(f'清理资源时出错: {e}')
     finally:
-        # 3. 强制退出进程
+        # 2. 强制退出进程（进程随即结束，无需再手动垃圾回收）
         try:
             os._exit(0)  # 使用 os._exit 强制退出，不执行清理钩子
         except:
@@ -90,17 +303,6 @@ def signal_handler(signum, frame):
     cleanup_resources()
 
 
-# 注册退出时的清理函数
-atexit.register(cleanup_resources)
-
-# 注册信号处理器
-try:
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
-except:
-    pass
-
-
 @eel.expose
 def load_file_from_path(file_path: str, file_index: int) -> dict:
     """
@@ -118,10 +320,11 @@ def load_file_from_path(file_path: str, file_index: int) -> dict:
         original_text, normalized_text = read_file(file_path)
         
         # 存储到全局变量（用于后续编辑和比对）
-        file_key = f'file{file_index}'
-        current_files[file_key]['path'] = file_path
-        current_files[file_key]['original'] = original_text
-        current_files[file_key]['normalized'] = normalized_text
+        slot = _get_slot(file_index)
+        slot.path = file_path
+        slot.original = _share_text(slot, 'original', original_text)
+        slot.set_normalized(_share_text(slot, 'normalized', normalized_text))
+        _clear_compare_cache()
         
         return {
             'success': True,
@@ -145,7 +348,7 @@ def load_file_from_content(file_name: str, file_content: bytes, file_extension:
     
     Args:
         file_name: 文件名
-        file_content: 文件内容的 base64 编码字符串或字节
+        file_content: 文件原始字节的 base64 编码字符串，或直接传入的字节
         file_extension: 文件扩展名（.txt 或 .docx）
         file_index: 文件索引（1 或 2）
         
@@ -153,51 +356,35 @@ def load_file_from_content(file_name: str, file_content: bytes, file_extension:
         包含文件内容和状态信息的字典
     """
     try:
-        import base64
-        import io
-        
-        # 如果 file_content 是字符串，尝试 base64 解码
-        if isinstance(file_content, str):
+        # 字节内容直接使用；字符串内容按 base64 解码（a2b_base64 可直接接受 ASCII 字符串，一次 C 调用完成）
+        if isinstance(file_content, (bytes, bytearray)):
+            file_bytes = bytes(file_content)
+        else:
             try:
-                file_bytes = base64.b64decode(file_content)
-            except:
+                file_bytes = binascii.a2b_base64(file_content)
+            except ValueError:
                 # 如果不是 base64，尝试直接使用字符串
                 file_bytes = file_content.encode('utf-8')
-        else:
-            file_bytes = file_content
         
         # 根据扩展名处理文件
         if file_extension.lower() == '.txt':
-            # 尝试不同的编码
-            try:
-                original_text = file_bytes.decode('utf-8')
-            except UnicodeDecodeError:
-                try:
-                    original_text = file_bytes.decode('gbk')
-                except UnicodeDecodeError:
-                    original_text = file_bytes.decode('latin-1', errors='ignore')
+            # 自动识别编码（BOM、UTF-8、GBK、latin-1）
+            original_text = decode_text_bytes(file_bytes)
         elif file_extension.lower() == '.docx':
-            # 对于 Word 文件，需要保存到临时文件或使用内存中的文件
-            from docx import Document
-            doc_file = io.BytesIO(file_bytes)
-            doc = Document(doc_file)
-            paragraphs = []
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    paragraphs.append(paragraph.text)
-            original_text = '\n'.join(paragraphs)
+            # 对于 Word 文件，直接从内存中的文件对象读取
+            original_text = extract_docx_text(io.BytesIO(file_bytes))
         else:
             raise ValueError(f"不支持的文件格式: {file_extension}")
         
         # 规范化文本
-        from app.file_handler import normalize_text
         normalized_text = normalize_text(original_text)
         
         # 存储到全局变量
-        file_key = f'file{file_index}'
-        current_files[file_key]['path'] = file_name  # 使用文件名作为标识
-        current_files[file_key]['original'] = original_text
-        current_files[file_key]['normalized'] = normalized_text
+        slot = _get_slot(file_index)
+        slot.path = file_name  # 使用文件名作为标识
+        slot.original = _share_text(slot, 'original', original_text)
+        slot.set_normalized(_share_text(slot, 'normalized', normalized_text))
+        _clear_compare_cache()
         
         return {
             'success': True,
@@ -223,19 +410,64 @@ def load_file(file_path: str, file_index: int) -> dict:
     return load_file_from_path(file_path, file_index)
 
 
+def _compare_files_result(future) -> dict:
+    """
+    将子进程中 compare_texts_packed 的执行结果转换为 compare_files 的结果字典
+    
+    Returns:
+        包含比对结果的字典
+    """
+    try:
+        # 差异已打包为 (text, status, start_pos, end_pos) 元组列表
+        diffs1, diffs2, approximate = future.result()
+        
+        result = {
+            'success': True,
+            'diffs1': diffs1,
+            'diffs2': diffs2,
+            'message': '比对完成（已忽略标点、空格、换行）'
+        }
+        
+        # 近似结果需要提示用户
+        if approximate:
+            result['approximate'] = True
+            result['message'] = _APPROXIMATE_MESSAGE
+        return result
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e),
+            'message': f'比对失败: {str(e)}'
+        }
+
+
+def _on_compare_done(cache_key: tuple, future) -> None:
+    """
+    比对任务完成时将结果写入缓存（即使前端没有取走结果，再次比对时也能命中）
+    """
+    if future.cancelled():
+        return
+    result = _compare_files_result(future)
+    if result['success']:
+        _store_cached_result(cache_key, result)
+
+
 @eel.expose
 def compare_files() -> dict:
     """
     比较两个文件的内容（使用规范化文本进行比对，忽略标点、空格、换行）
     
-    由于前端显示的是规范化文本，这里直接比较规范化文本
+    由于前端显示的是规范化文本，这里直接比较规范化文本。
+    缓存命中时直接返回比对结果；否则将比对提交到后台进程，返回任务 ID，
+    前端通过 get_job_result 获取结果
     
     Returns:
-        包含比对结果的字典
+        包含比对结果的字典，或包含 'pending' 和 'job_id' 的任务信息
     """
     try:
-        file1_normalized = current_files['file1']['normalized']
-        file2_normalized = current_files['file2']['normalized']
+        slot1, slot2 = current_files
+        file1_normalized = slot1.normalized
+        file2_normalized = slot2.normalized
         
         # 检查是否已加载两个文件
         if not file1_normalized and not file2_normalized:
@@ -254,19 +486,38 @@ def compare_files() -> dict:
                 'message': '需要加载两个文件才能进行比对'
             }
         
+        # 摘要相同说明两个文本完全一致，无需比对
+        if slot1.norm_digest == slot2.norm_digest:
+            return {
+                'success': True,
+                'diffs1': [(file1_normalized, 'equal', 0, len(file1_normalized))],
+                'diffs2': [(file2_normalized, 'equal', 0, len(file2_normalized))],
+                'message': '比对完成，两个文件内容一致（已忽略标点、空格、换行）'
+            }
+        
+        # 内容未变化时直接返回缓存的比对结果
+        cache_key = ('compare_files', hash(file1_normalized), hash(file2_normalized))
+        cached = _get_cached_result(cache_key)
+        if cached is not None:
+            return cached
+        
         # 直接比较规范化文本（因为前端显示的就是规范化文本）
-        from app.text_compare import compare_texts, TextDiff
-        diffs1, diffs2 = compare_texts(file1_normalized, file2_normalized)
+        # 提交时传入当前文本，后台比对期间的编辑不会影响本次结果
+        job_id = next(_job_ids)
+        future = _submit_compare(file1_normalized, file2_normalized)
+        future.add_done_callback(lambda f: _on_compare_done(cache_key, f))
+        _jobs[job_id] = future
         
-        # 转换为字典列表
-        diffs1_dict = [diff.to_dict() for diff in diffs1]
-        diffs2_dict = [diff.to_dict() for diff in diffs2]
+        # 淘汰最早提交且结果无人取走的任务（尚未开始执行的任务会被取消）
+        while len(_jobs) > _MAX_JOBS:
+            _, stale = _jobs.popitem(last=False)
+            stale.cancel()
         
         return {
             'success': True,
-            'diffs1': diffs1_dict,
-            'diffs2': diffs2_dict,
-            'message': '比对完成（已忽略标点、空格、换行）'
+            'pending': True,
+            'job_id': job_id,
+            'message': '正在比对'
         }
     except Exception as e:
         return {
@@ -276,6 +527,42 @@ def compare_files() -> dict:
         }
 
 
+@eel.expose
+def get_job_result(job_id: int) -> dict:
+    """
+    获取后台比对任务的结果
+    
+    Args:
+        job_id: compare_files 返回的任务 ID
+        
+    Returns:
+        任务未完成时返回 {'success': True, 'pending': True}，完成后返回比对结果字典
+    """
+    try:
+        future = _jobs.get(job_id)
+        if future is None:
+            return {
+                'success': False,
+                'error': f'比对任务不存在: {job_id}',
+                'message': '比对任务不存在或结果已被取走'
+            }
+        
+        if not future.done():
+            return {
+                'success': True,
+                'pending': True
+            }
+        
+        del _jobs[job_id]
+        return _compare_files_result(future)
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e),
+            'message': f'比对失败: {str(e)}'
+        }
+
+
 @eel.expose
 def update_file_content(file_index: int, new_content: str) -> dict:
     """
@@ -291,9 +578,12 @@ def update_file_content(file_index: int, new_content: str) -> dict:
         包含更新状态的字典
     """
     try:
-        file_key = f'file{file_index}'
+        slot = _get_slot(file_index)
         # 更新规范化文本（前端显示和编辑的就是规范化文本）
-        current_files[file_key]['normalized'] = new_content
+        # 内容未变化时保留缓存，避免每次比对前的同步操作使缓存失效
+        if slot.normalized != new_content:
+            slot.set_normalized(_share_text(slot, 'normalized', new_content))
+            _clear_compare_cache()
         
         return {
             'success': True,
@@ -319,9 +609,8 @@ def get_file_content(file_index: int) -> dict:
         包含文件内容的字典
     """
     try:
-        file_key = f'file{file_index}'
         # 返回规范化文本（因为前端显示的就是规范化文本）
-        content = current_files[file_key]['normalized']
+        content = _get_slot(file_index).normalized
         
         return {
             'success': True,
@@ -344,10 +633,11 @@ def compare_with_normalization() -> dict:
         包含比对结果的字典
     """
     try:
-        file1_original = current_files['file1']['original']
-        file1_normalized = current_files['file1']['normalized']
-        file2_original = current_files['file2']['original']
-        file2_normalized = current_files['file2']['normalized']
+        slot1, slot2 = current_files
+        file1_original = slot1.original
+        file1_normalized = slot1.normalized
+        file2_original = slot2.original
+        file2_normalized = slot2.normalized
         
         # 检查是否已加载两个文件
         if not file1_original and not file2_original:
@@ -365,10 +655,19 @@ def compare_with_normalization() -> dict:
                 'message': '需要加载两个文件才能进行比对'
             }
         
-        # 使用规范化文本进行比较，但返回原始文本的差异
-        diffs1, diffs2 = compare_normalized_texts(file1_original, file1_normalized, file2_original, file2_normalized)
+        # 内容未变化时直接返回缓存的比对结果
+        cache_key = ('compare_with_normalization',
+                     hash(file1_original), hash(file1_normalized),
+                     hash(file2_original), hash(file2_normalized))
+        cached = _get_cached_result(cache_key)
+        if cached is not None:
+            return cached
         
-        return {
+        # 使用规范化文本进行比较，但返回原始文本的差异（位置映射在文本未变化时复用）
+        diffs1, diffs2, approximate = compare_normalized_texts(file1_original, file1_normalized, file2_original, file2_normalized,
+                                                  _get_char_mapping(slot1), _get_char_mapping(slot2))
+        
+        result = {
             'success': True,
             'diffs1': diffs1,
             'diffs2': diffs2,
@@ -376,6 +675,12 @@ def compare_with_normalization() -> dict:
             'normalized2': file2_normalized,
             'message': '比对完成'
         }
+        
+        if approximate:
+            result['approximate'] = True
+            result['message'] = _APPROXIMATE_MESSAGE
+        _store_cached_result(cache_key, result)
+        return dict(result)
     except Exception as e:
         return {
             'success': False,
@@ -387,7 +692,25 @@ def compare_with_normalization() -> dict:
 def main():
     """
     主函数：启动 Eel 应用
+    
+    应用的初始化放在这里而不是模块顶层：比对子进程以 spawn 方式启动时会重新导入本模块，
+    不应重复初始化 Eel 或注册清理函数
     """
+    _install_fast_json()
+    
+    # 初始化 Eel，指定前端文件目录
+    eel.init('web')
+    
+    # 注册退出时的清理函数
+    atexit.register(cleanup_resources)
+    
+    # 注册信号处理器
+    try:
+        signal.signal(signal.SIGINT, signal_handler)
+        signal.signal(signal.SIGTERM, signal_handler)
+    except:
+        pass
+    
     # 启动 Eel 应用
     # start() 方法会启动一个本地 Web 服务器并打开浏览器
     # mode='chrome' 表示以 Chrome 应用模式运行（桌面应用）
@@ -414,4 +737,6 @@ def main():
 
 
 if __name__ == '__main__':
+    # 打包后的程序通过重新启动自身创建比对子进程，需要先交给 multiprocessing 处理
+    multiprocessing.freeze_support()
     main()
@@ -47,65 +47,46 @@ async function handleFileSelect(event) {
             return;
         }
         
-        // 使用 FileReader 读取文件
-        const reader = new FileReader();
+        // 读取文件原始字节的 base64 编码（TXT 的编码识别交给后端处理）
+        const base64Content = await readFileAsBase64(file);
         
-        if (fileExtension === '.txt') {
-            // 文本文件使用文本方式读取
-            reader.onload = async function(e) {
-                try {
-                    const fileContent = e.target.result;
-                    // 将文本内容转换为 base64 编码
-                    const base64Content = btoa(unescape(encodeURIComponent(fileContent)));
-                    
-                    // 调用 Python 后端加载文件
-                    const result = await eel.load_file_from_content(fileName, base64Content, fileExtension, fileIndex)();
-                    
-                    handleFileLoadResult(result, fileIndex, fileName);
-                } catch (error) {
-                    updateStatus(`错误: ${error.message}`, 'error');
-                    console.error('加载文件错误:', error);
-                    alert(`加载文件时发生错误: ${error.message}`);
-                }
-                fileInput.value = '';
-            };
-            reader.readAsText(file, 'UTF-8');
-        } else {
-            // Word 文件使用二进制方式读取
-            reader.onload = async function(e) {
-                try {
-                    const arrayBuffer = e.target.result;
-                    // 将 ArrayBuffer 转换为 base64 编码
-                    const bytes = new Uint8Array(arrayBuffer);
-                    const binary = String.fromCharCode.apply(null, bytes);
-                    const base64Content = btoa(binary);
-                    
-                    // 调用 Python 后端加载文件
-                    const result = await eel.load_file_from_content(fileName, base64Content, fileExtension, fileIndex)();
-                    
-                    handleFileLoadResult(result, fileIndex, fileName);
-                } catch (error) {
-                    updateStatus(`错误: ${error.message}`, 'error');
-                    console.error('加载文件错误:', error);
-                    alert(`加载文件时发生错误: ${error.message}`);
-                }
-                fileInput.value = '';
-            };
-            reader.readAsArrayBuffer(file);
-        }
+        // 调用 Python 后端加载文件
+        const result = await eel.load_file_from_content(fileName, base64Content, fileExtension, fileIndex)();
         
-        reader.onerror = function() {
-            updateStatus('读取文件失败', 'error');
-            fileInput.value = '';
-        };
+        handleFileLoadResult(result, fileIndex, fileName);
+        fileInput.value = '';
         
     } catch (error) {
         updateStatus(`错误: ${error.message}`, 'error');
-        console.error('文件选择错误:', error);
+        console.error('加载文件错误:', error);
+        alert(`加载文件时发生错误: ${error.message}`);
         fileInput.value = '';
     }
 }
 
+/**
+ * 读取文件的原始字节并返回 base64 编码
+ * 使用浏览器原生的 readAsDataURL 完成编码，避免在 JavaScript 中逐字节拼接字符串
+ * @param {File} file - 要读取的文件
+ * @returns {Promise<string>} 文件内容的 base64 编码字符串
+ */
+function readFileAsBase64(file) {
+    return new Promise((resolve, reject) => {
+        const reader = new FileReader();
+        reader.onload = function(e) {
+            // data URL 格式为 "data:<类型>;base64,<内容>"，只保留逗号后的 base64 部分
+            // 空文件时 Chromium 返回不带逗号的 "data:"，此时内容为空
+            const dataUrl = e.target.result;
+            const commaIndex = dataUrl.indexOf(',');
+            resolve(commaIndex === -1 ? '' : dataUrl.substring(commaIndex + 1));
+        };
+        reader.onerror = function() {
+            reject(new Error('读取文件失败'));
+        };
+        reader.readAsDataURL(file);
+    });
+}
+
 /**
  * 处理文件加载结果
  * @param {Object} result - 文件加载结果
@@ -176,14 +157,24 @@ async function performCompare() {
         currentFile2.normalized = normalized2;
         
         // 执行比对（使用规范化文本直接比对，因为显示的就是规范化文本）
-        const result = await eel.compare_files()();
+        let result = await eel.compare_files()();
+        
+        // 比对在后台线程执行时，轮询获取结果
+        if (result.success && result.pending) {
+            result = await waitForJobResult(result.job_id);
+        }
         
         if (result.success) {
             // 应用高亮显示（比对结果直接对应规范化文本）
             applyHighlights('editor1', result.diffs1);
             applyHighlights('editor2', result.diffs2);
             
-            updateStatus('比对完成，差异已高亮显示', 'success');
+            if (result.approximate) {
+                // 差异过大时后端只返回整体标记的近似结果
+                updateStatus(result.message, 'info');
+            } else {
+                updateStatus('比对完成，差异已高亮显示', 'success');
+            }
         } else {
             updateStatus(`比对失败: ${result.message}`, 'error');
             alert(`比对失败: ${result.message}`);
@@ -197,6 +188,21 @@ async function performCompare() {
     }
 }
 
+/**
+ * 轮询后台比对任务，直到返回结果
+ * @param {number} jobId - compare_files 返回的任务 ID
+ * @returns {Promise<Object>} 比对结果
+ */
+async function waitForJobResult(jobId) {
+    while (true) {
+        const result = await eel.get_job_result(jobId)();
+        if (!result.pending) {
+            return result;
+        }
+        await new Promise(resolve => setTimeout(resolve, 50));
+    }
+}
+
 /**
  * 应用文本高亮显示
  * @param {string} editorId - 编辑器元素 ID
@@ -220,8 +226,10 @@ function applyHighlights(editorId, diffs) {
     let position = 0;
     
     for (const diff of diffs) {
-        const text = diff.text || '';
-        const status = diff.status || 'equal';
+        // compare_files 返回 [text, status, start_pos, end_pos] 数组，其他接口返回字典
+        const isPacked = Array.isArray(diff);
+        const text = (isPacked ? diff[0] : diff.text) || '';
+        const status = (isPacked ? diff[1] : diff.status) || 'equal';
         
         // 转义 HTML 特殊字符
         const escapedText = escapeHtml(text);
@@ -479,54 +487,13 @@ async function handleDrop(event, fileIndex) {
     updateStatus(`正在加载文件 ${fileIndex}...`, 'info');
     
     try {
-        // 使用 FileReader 读取文件
-        const reader = new FileReader();
+        // 读取文件原始字节的 base64 编码（TXT 的编码识别交给后端处理）
+        const base64Content = await readFileAsBase64(file);
         
-        if (fileExtension === '.txt') {
-            // 文本文件使用文本方式读取
-            reader.onload = async function(e) {
-                try {
-                    const fileContent = e.target.result;
-                    // 将文本内容转换为 base64 编码
-                    const base64Content = btoa(unescape(encodeURIComponent(fileContent)));
-                    
-                    // 调用 Python 后端加载文件
-                    const result = await eel.load_file_from_content(fileName, base64Content, fileExtension, fileIndex)();
-                    
-                    handleFileLoadResult(result, fileIndex, fileName);
-                } catch (error) {
-                    updateStatus(`错误: ${error.message}`, 'error');
-                    console.error('加载文件错误:', error);
-                    alert(`加载文件时发生错误: ${error.message}`);
-                }
-            };
-            reader.readAsText(file, 'UTF-8');
-        } else {
-            // Word 文件使用二进制方式读取
-            reader.onload = async function(e) {
-                try {
-                    const arrayBuffer = e.target.result;
-                    // 将 ArrayBuffer 转换为 base64 编码
-                    const bytes = new Uint8Array(arrayBuffer);
-                    const binary = String.fromCharCode.apply(null, bytes);
-                    const base64Content = btoa(binary);
-                    
-                    // 调用 Python 后端加载文件
-                    const result = await eel.load_file_from_content(fileName, base64Content, fileExtension, fileIndex)();
-                    
-                    handleFileLoadResult(result, fileIndex, fileName);
-                } catch (error) {
-                    updateStatus(`错误: ${error.message}`, 'error');
-                    console.error('加载文件错误:', error);
-                    alert(`加载文件时发生错误: ${error.message}`);
-                }
-            };
-            reader.readAsArrayBuffer(file);
-        }
+        // 调用 Python 后端加载文件
+        const result = await eel.load_file_from_content(fileName, base64Content, fileExtension, fileIndex)();
         
-        reader.onerror = function() {
-            updateStatus('读取文件失败', 'error');
-        };
+        handleFileLoadResult(result, fileIndex, fileName);
         
     } catch (error) {
         updateStatus(`错误: ${error.message}`, 'error');